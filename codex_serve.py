@@ -1,5 +1,7 @@
 import os
 import asyncio
+import concurrent.futures
+import hashlib
 import json
 import codecs
 import base64
@@ -9,18 +11,47 @@ import tempfile
 import urllib.request
 import urllib.error
 import urllib.parse
+import secrets
+import signal
 import socket
 import ssl
+import sys
 import math
 import shlex
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from uuid import uuid4
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-app = FastAPI()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Serialize non-streaming responses (e.g. /sessions/{id}/stop) with orjson
+# when it is installed; the streaming and prebuilt-body endpoints bypass the
+# response class either way.
+app = FastAPI(
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
+)
 logger = logging.getLogger("codex.serve")
 logger.setLevel(logging.INFO)
 
@@ -51,6 +82,54 @@ class RunResponse(BaseModel):
     exit_code: int
 
 
+if msgspec is not None:
+    class _ContextFileItemSpec(msgspec.Struct):
+        path: str
+        content: Optional[str] = None
+        base64Content: Optional[str] = None
+
+    class _RunRequestSpec(msgspec.Struct):
+        agent: str
+        args: List[str]
+        stdin: str
+        env: Optional[Dict[str, str]] = None
+        sessionId: Optional[str] = None
+        contextFiles: Optional[List[_ContextFileItemSpec]] = None
+
+    _RUN_REQUEST_DECODER = msgspec.json.Decoder(_RunRequestSpec)
+else:
+    _RUN_REQUEST_DECODER = None
+
+
+async def _decode_run_request(request: Request) -> Any:
+    """Decode the /agent/run body without the Pydantic hot path.
+
+    msgspec decodes and type-checks the JSON body in a single C-level pass,
+    which is markedly cheaper than Pydantic validation for short agent runs.
+    Falls back to the RunRequest Pydantic model when msgspec is unavailable.
+    The returned object exposes the same attributes as RunRequest.
+    """
+    body = await request.body()
+    if _RUN_REQUEST_DECODER is not None:
+        try:
+            return _RUN_REQUEST_DECODER.decode(body)
+        except msgspec.ValidationError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+        except msgspec.DecodeError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}") from exc
+
+    try:
+        payload = json.loads(body.decode("utf-8", errors="replace") or "{}")
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object")
+    try:
+        return RunRequest(**payload)
+    except Exception as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
 class InsightFileResult(BaseModel):
     path: str
     content: str
@@ -123,10 +202,31 @@ AGENT_LIST = [
 ]
 TEAM_AGENT_NAME = "team"
 
+# Frozen view of AGENT_LIST for O(1) membership checks on the request path.
+# Interning the names gives the set lookup a pointer-identity fast path for
+# agent strings that the JSON decoder has also interned.
+AGENT_SET = frozenset(sys.intern(agent) for agent in AGENT_LIST)
+
+# Invariant docker command prefix, materialized per request with list().
+DOCKER_CMD_BASE = ("docker", "run", "--rm", "-i")
+
 # Optional Docker configuration
 DOCKER_IMAGE = os.environ.get("CODEX_AGENT_IMAGE")
 INSIGHT_DOCKER_IMAGE = os.environ.get("CODEX_INSIGHT_IMAGE", "craftslab/codex-insight:latest")
 
+# Snapshot of the process environment taken at import time.  Passing this
+# dict (unmodified) to subprocesses avoids re-copying every environment
+# variable on each request; it is only copied when a request supplies
+# overrides.
+BASE_ENV = os.environ.copy()
+
+# Default LiteLLM settings forwarded to containers, resolved once at import.
+LITELLM_DEFAULT_ENV = {
+    env_key: env_val
+    for env_key in ("LITELLM_BASE_URL", "LITELLM_API_KEY", "LITELLM_SSL_VERIFY", "LITELLM_CA_BUNDLE")
+    if (env_val := os.environ.get(env_key))
+}
+
 DEFAULT_AGENT_MODEL = []
 AGENT_MODEL = [
     model.strip()
@@ -134,10 +234,21 @@ AGENT_MODEL = [
     if model.strip()
 ]
 
+# Fixed for the process lifetime, so resolved once here instead of per
+# "auto" model lookup.
+AUTO_MODEL_CANDIDATES = tuple(
+    model for model in AGENT_MODEL if model.strip() and model.strip().lower() != "auto"
+)
+
+# Probe order for LiteLLM metadata endpoints.
+LITELLM_METADATA_ENDPOINTS = ("/model/info", "/v1/model/info", "/models", "/v1/models")
+
+# Session registries.  All mutations happen between await points on a single
+# event loop, so plain dict/set operations are already mutually exclusive and
+# no asyncio.Lock is needed.
 RUN_SESSIONS: Dict[str, asyncio.subprocess.Process] = {}
 TEAM_RUN_SESSIONS = set()
 STOP_REQUESTED_SESSIONS = set()
-SESSIONS_LOCK = asyncio.Lock()
 
 
 def _parse_response_timeout_seconds(value: Optional[str]) -> Optional[float]:
@@ -294,6 +405,27 @@ SANDBOX_HARD_TIMEOUT_SECONDS = (
     _parse_response_timeout_seconds(os.environ.get("SANDBOX_HARD_TIMEOUT_SECONDS")) or 3.0
 )
 
+# Chunk size for reads from agent stdout/stderr pipes.  Larger reads mean
+# fewer bytes allocations and task wake-ups per MB of agent output.
+STREAM_READ_CHUNK_BYTES = max(
+    4096,
+    _parse_non_negative_int(os.environ.get("AGENT_STREAM_READ_BYTES"), 65_536),
+)
+
+# Optional pool of pre-started agent containers (Docker mode only).  When
+# > 0, that many containers are kept warm and requests dispatch via
+# `docker exec -i`, skipping the per-request `docker run` cold start.
+AGENT_WARM_CONTAINERS = _parse_non_negative_int(os.environ.get("AGENT_WARM_CONTAINERS"), 0)
+
+# Coalescing window for NDJSON stream frames.  Token-streaming agents emit
+# many tiny lines; batching them into one HTTP chunk (up to CODEX_FLUSH_BYTES
+# or CODEX_FLUSH_MS, whichever is hit first) amortizes chunk framing and
+# kernel send cost.  CODEX_FLUSH_BYTES=0 flushes every frame immediately.
+STREAM_FLUSH_MAX_BYTES = _parse_non_negative_int(os.environ.get("CODEX_FLUSH_BYTES"), 16_384)
+STREAM_FLUSH_WINDOW_SECONDS = (
+    _parse_response_timeout_seconds(os.environ.get("CODEX_FLUSH_MS")) or 2.0
+) / 1000.0
+
 AUTO_COMPRESS_ON_CONTEXT_OVERFLOW = (
     (os.environ.get("AUTO_COMPRESS_ON_CONTEXT_OVERFLOW") or "true").strip().lower()
     in {"1", "true", "yes", "on"}
@@ -354,6 +486,77 @@ CONTEXT_OVERFLOW_ERROR_PATTERNS = (
 )
 
 
+def _parse_json_bytes(body: bytes) -> Any:
+    """Parse a JSON payload straight from bytes.
+
+    orjson parses bytes natively at C speed; the stdlib fallback also accepts
+    bytes, so neither path needs an intermediate decoded str.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _encode_ndjson_frame(item: Dict[str, Any]) -> bytes:
+    """Encode one NDJSON frame as bytes, ready to stream.
+
+    Uses orjson (C-level encoder, returns bytes directly) when available and
+    falls back to stdlib json otherwise.  Yielding bytes lets StreamingResponse
+    skip the per-frame str->utf-8 encode pass.
+    """
+    if orjson is not None:
+        return orjson.dumps(item) + b"\n"
+    return json.dumps(item).encode("utf-8") + b"\n"
+
+
+# Pre-built framing bytes for the two hot stream frame shapes.  Only the
+# "data" value varies per line, so the structural JSON around it is encoded
+# once at import instead of per chunk.
+_STREAM_FRAME_PREFIXES = {
+    "stdout": b'{"type":"stdout","data":',
+    "stderr": b'{"type":"stderr","data":',
+}
+_STREAM_FRAME_SUFFIX = b"}\n"
+
+
+def _encode_stream_frame(type_label: str, data: str) -> bytes:
+    """Encode a stdout/stderr data frame around a pre-built byte prefix.
+
+    Skips the per-line dict allocation and half the structural JSON encoding
+    compared to _encode_ndjson_frame; non-stream frame types fall back to the
+    generic encoder.
+    """
+    prefix = _STREAM_FRAME_PREFIXES.get(type_label)
+    if prefix is None:
+        return _encode_ndjson_frame({"type": type_label, "data": data})
+    if orjson is not None:
+        return prefix + orjson.dumps(data) + _STREAM_FRAME_SUFFIX
+    return prefix + json.dumps(data).encode("utf-8") + _STREAM_FRAME_SUFFIX
+
+
+# Lines above this size are encoded in a worker thread as a best-effort way
+# to keep large single-frame encodes from running back-to-back with other
+# event-loop callbacks.  orjson holds the GIL while serializing, so this
+# bounds scheduling latency rather than buying real parallelism.  0 disables
+# offloading.
+ENCODE_OFFLOAD_MIN_CHARS = _parse_non_negative_int(
+    os.environ.get("AGENT_ENCODE_OFFLOAD_CHARS"),
+    8192,
+)
+_ENCODE_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=2,
+    thread_name_prefix="ndjson-encode",
+)
+
+
+async def _encode_stream_frame_offloaded(type_label: str, data: str) -> bytes:
+    if ENCODE_OFFLOAD_MIN_CHARS <= 0 or len(data) <= ENCODE_OFFLOAD_MIN_CHARS:
+        return _encode_stream_frame(type_label, data)
+    return await asyncio.get_running_loop().run_in_executor(
+        _ENCODE_POOL, _encode_stream_frame, type_label, data
+    )
+
+
 class _QueueLease:
     def __init__(self, semaphore: asyncio.Semaphore):
         self._semaphore = semaphore
@@ -554,33 +757,39 @@ def _compress_stdin_payload(payload: str, max_chars: int, keep_head_chars: int)
     return compressed
 
 
-def _extract_model_from_args(args: List[str]) -> Optional[str]:
-    for idx, arg in enumerate(args):
-        if arg in ("--model", "-m"):
-            if idx + 1 < len(args):
-                model = args[idx + 1].strip()
-                return model or None
-            return None
-        if arg.startswith("--model="):
-            model = arg.split("=", 1)[1].strip()
-            return model or None
-    return None
-
+def _split_model_args(args: List[str]) -> tuple[Optional[str], List[str]]:
+    """Single pass over args returning (model, args without model flags).
 
-def _strip_model_args(args: List[str]) -> List[str]:
-    normalized_args: List[str] = []
+    The first model flag wins, matching the old _extract_model_from_args;
+    callers that need both the model and the stripped args no longer walk
+    the list twice.
+    """
+    model: Optional[str] = None
+    model_seen = False
+    stripped: List[str] = []
     idx = 0
     while idx < len(args):
         arg = args[idx]
         if arg in ("--model", "-m"):
+            if not model_seen:
+                model_seen = True
+                if idx + 1 < len(args):
+                    model = args[idx + 1].strip() or None
             idx += 2
             continue
         if arg.startswith("--model="):
+            if not model_seen:
+                model_seen = True
+                model = arg.split("=", 1)[1].strip() or None
             idx += 1
             continue
-        normalized_args.append(arg)
+        stripped.append(arg)
         idx += 1
-    return normalized_args
+    return model, stripped
+
+
+def _extract_model_from_args(args: List[str]) -> Optional[str]:
+    return _split_model_args(args)[0]
 
 
 def _replace_model_args(args: List[str], model: str) -> List[str]:
@@ -725,7 +934,11 @@ def _score_model(metadata: Optional[Dict[str, Any]], preferred_order_index: int)
     return (has_metadata, performance_value, rate_limit_value, -preferred_order_index)
 
 
+@lru_cache(maxsize=8)
 def _build_ssl_context(verify_ssl: bool, ca_bundle: Optional[str]):
+    # Building a default context re-reads and parses the CA bundle from disk;
+    # the handful of (verify, bundle) combinations a deployment uses are
+    # stable for the process lifetime, so cache the contexts.
     if verify_ssl:
         if ca_bundle:
             return ssl.create_default_context(cafile=ca_bundle)
@@ -737,17 +950,79 @@ def _build_ssl_context(verify_ssl: bool, ca_bundle: Optional[str]):
     return unverified
 
 
+_LITELLM_HTTP_SESSION = None
+
+
+def _litellm_http_session():
+    """Shared aiohttp session for upstream LiteLLM calls: keeps connections
+    and TLS sessions alive across requests instead of paying a fresh
+    handshake (and a thread-pool hop) per fetch."""
+    global _LITELLM_HTTP_SESSION
+    if _LITELLM_HTTP_SESSION is None or _LITELLM_HTTP_SESSION.closed:
+        _LITELLM_HTTP_SESSION = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=8.0)
+        )
+    return _LITELLM_HTTP_SESSION
+
+
+@app.on_event("shutdown")
+async def _close_litellm_http_session() -> None:
+    if _LITELLM_HTTP_SESSION is not None and not _LITELLM_HTTP_SESSION.closed:
+        await _LITELLM_HTTP_SESSION.close()
+
+
 async def _fetch_litellm_model_metadata(base_url: str, api_key: str, verify_ssl: bool, ca_bundle: Optional[str]) -> Dict[str, Dict[str, Any]]:
     normalized_base = (base_url or "").strip().rstrip("/")
     if not normalized_base:
         return {}
 
     ssl_context = _build_ssl_context(verify_ssl, ca_bundle)
-    endpoints = ["/model/info", "/v1/model/info", "/models", "/v1/models"]
+    endpoints = LITELLM_METADATA_ENDPOINTS
     headers = {"Accept": "application/json"}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
 
+    if aiohttp is not None:
+        session = _litellm_http_session()
+
+        async def _probe(endpoint: str) -> Dict[str, Dict[str, Any]]:
+            url = f"{normalized_base}{endpoint}"
+            try:
+                async with session.get(url, headers=headers, ssl=ssl_context) as response:
+                    if response.status < 200 or response.status >= 300:
+                        return {}
+                    body = await response.read()
+            except Exception:
+                return {}
+
+            try:
+                payload = _parse_json_bytes(body) if body.strip() else {}
+            except Exception:
+                return {}
+            if not isinstance(payload, dict):
+                return {}
+            return _extract_litellm_model_metadata(payload) or {}
+
+        # Probe all candidate endpoints at once and take the first one that
+        # yields usable metadata; a slow or dead endpoint no longer delays
+        # the others, so latency is bounded by the fastest responder.
+        probe_tasks = {asyncio.create_task(_probe(endpoint)) for endpoint in endpoints}
+        try:
+            while probe_tasks:
+                done, probe_tasks = await asyncio.wait(
+                    probe_tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for finished_task in done:
+                    metadata = finished_task.result()
+                    if metadata:
+                        return metadata
+        finally:
+            for task in probe_tasks:
+                task.cancel()
+            if probe_tasks:
+                await asyncio.gather(*probe_tasks, return_exceptions=True)
+        return {}
+
     def _do_fetch() -> Dict[str, Dict[str, Any]]:
         for endpoint in endpoints:
             url = f"{normalized_base}{endpoint}"
@@ -757,12 +1032,12 @@ async def _fetch_litellm_model_metadata(base_url: str, api_key: str, verify_ssl:
                     status = getattr(response, "status", 200)
                     if status < 200 or status >= 300:
                         continue
-                    body = response.read().decode("utf-8", errors="replace")
+                    body = response.read()
             except Exception:
                 continue
 
             try:
-                payload = json.loads(body) if body.strip() else {}
+                payload = _parse_json_bytes(body) if body.strip() else {}
             except Exception:
                 continue
             if not isinstance(payload, dict):
@@ -780,7 +1055,7 @@ async def _resolve_auto_model(args: List[str], req_env: Optional[Dict[str, str]]
     if requested_model != "auto":
         return None
 
-    candidate_models = [model for model in AGENT_MODEL if model.strip() and model.strip().lower() != "auto"]
+    candidate_models = AUTO_MODEL_CANDIDATES
     if not candidate_models:
         return None
 
@@ -817,14 +1092,19 @@ async def _resolve_auto_model(args: List[str], req_env: Optional[Dict[str, str]]
     return best_model
 
 
-def _build_docker_env(agent: str, args: List[str], req_env: Optional[Dict[str, str]]) -> Dict[str, str]:
-    docker_env: Dict[str, str] = {}
-
+@lru_cache(maxsize=1024)
+def _build_docker_env_cached(
+    agent: str,
+    inferred_model: Optional[str],
+    env_items: tuple,
+) -> Dict[str, str]:
+    """Container env, memoized: deterministic in its inputs, and most callers
+    send the same (agent, model, env) tuple on every request.  env_items is
+    the request env as sorted (key, value) pairs; the returned dict is shared
+    by the cache and must not be mutated."""
+    req_env = dict(env_items)
     # Default LiteLLM settings from codex.serve runtime env (e.g., docker-compose).
-    for env_key in ("LITELLM_BASE_URL", "LITELLM_API_KEY", "LITELLM_SSL_VERIFY", "LITELLM_CA_BUNDLE"):
-        env_val = os.environ.get(env_key)
-        if env_val:
-            docker_env[env_key] = env_val
+    docker_env: Dict[str, str] = LITELLM_DEFAULT_ENV.copy()
 
     # Request env can optionally override defaults.
     docker_env.update(req_env or {})
@@ -838,42 +1118,202 @@ def _build_docker_env(agent: str, args: List[str], req_env: Optional[Dict[str, s
     elif docker_env.get("LITELLM_MODEL") is not None:
         docker_env.pop("LITELLM_MODEL", None)
 
-    # If no explicit model env provided, infer from common agent flags.
+    # If no explicit model env provided, use the model inferred from common
+    # agent flags by the caller's single _split_model_args pass.
     if not docker_env.get("LITELLM_MODEL"):
-        inferred_model = (_extract_model_from_args(args) or "").strip() or None
-        if inferred_model:
-            docker_env["LITELLM_MODEL"] = inferred_model
+        normalized_model = (inferred_model or "").strip() or None
+        if normalized_model:
+            docker_env["LITELLM_MODEL"] = normalized_model
 
     return docker_env
 
 
+def _docker_env_flags(
+    agent: str,
+    inferred_model: Optional[str],
+    req_env: Optional[Dict[str, str]],
+) -> tuple:
+    """Flattened ("-e", "KEY=VAL", ...) segment for the docker command line,
+    cached alongside the env dict it is derived from so repeat requests skip
+    the per-entry formatting loop."""
+    env_items = tuple(sorted(req_env.items())) if req_env else ()
+    return _docker_env_flags_cached(agent, inferred_model, env_items)
+
+
+@lru_cache(maxsize=1024)
+def _docker_env_flags_cached(
+    agent: str,
+    inferred_model: Optional[str],
+    env_items: tuple,
+) -> tuple:
+    flags: List[str] = []
+    docker_env = _build_docker_env_cached(agent, inferred_model, env_items)
+    for env_key, env_val in docker_env.items():
+        flags.extend(("-e", f"{env_key}={env_val}"))
+    return tuple(flags)
+
+
 def _build_agent_command(
     agent: str,
     args: List[str],
     req_env: Optional[Dict[str, str]],
 ) -> tuple[List[str], Dict[str, str]]:
-    popen_env = os.environ.copy()
     normalized_args = list(args)
 
     if DOCKER_IMAGE:
-        command = ["docker", "run", "--rm", "-i"]
-        docker_env = _build_docker_env(agent, normalized_args, req_env)
+        command = list(DOCKER_CMD_BASE)
+        model, stripped_args = _split_model_args(normalized_args)
 
         if agent in ("opencode", "codex", "kimi"):
-            normalized_args = _strip_model_args(normalized_args)
-
-        for env_key, env_val in docker_env.items():
-            command.extend(["-e", f"{env_key}={env_val}"])
+            normalized_args = stripped_args
 
+        command.extend(_docker_env_flags(agent, model, req_env))
         command.append(DOCKER_IMAGE)
         command.append(agent)
         command.extend(normalized_args)
-        return command, popen_env
+        # Request env is forwarded through docker -e flags; the docker CLI
+        # itself runs with the unmodified base environment.
+        return command, BASE_ENV
 
     command = [agent] + normalized_args
     if req_env:
-        popen_env.update(req_env)
-    return command, popen_env
+        return command, {**BASE_ENV, **req_env}
+    return command, BASE_ENV
+
+
+_WARM_CONTAINER_POOL: Optional[asyncio.Queue] = None
+_WARM_POOL_LOCK = asyncio.Lock()
+# Every container ever started for the pool, busy or idle, so shutdown can
+# remove them all.
+_WARM_CONTAINER_IDS: set = set()
+_WARM_CONTAINER_LABEL = "codex.serve.warm=1"
+
+
+async def _start_warm_container() -> Optional[str]:
+    code, stdout_text, stderr_text = await _run_subprocess_capture(
+        [
+            "docker", "run", "-d", "--label", _WARM_CONTAINER_LABEL,
+            "--entrypoint", "sleep", DOCKER_IMAGE, "infinity",
+        ],
+        timeout=120.0,
+    )
+    if code != 0:
+        logger.warning("failed to start warm agent container: %s", stderr_text.strip())
+        return None
+    container_id = stdout_text.strip() or None
+    if container_id:
+        _WARM_CONTAINER_IDS.add(container_id)
+    return container_id
+
+
+async def _is_warm_container_running(container_id: str) -> bool:
+    code, stdout_text, _ = await _run_subprocess_capture(
+        ["docker", "inspect", "-f", "{{.State.Running}}", container_id],
+        timeout=30.0,
+    )
+    return code == 0 and stdout_text.strip() == "true"
+
+
+async def _remove_warm_container(container_id: str) -> None:
+    _WARM_CONTAINER_IDS.discard(container_id)
+    code, _, stderr_text = await _run_subprocess_capture(
+        ["docker", "rm", "-f", container_id],
+        timeout=60.0,
+    )
+    if code != 0:
+        logger.warning(
+            "failed to remove warm agent container %s: %s", container_id, stderr_text.strip()
+        )
+
+
+async def _acquire_warm_container() -> Optional[str]:
+    """Return a warm container id, or None to fall back to cold docker run.
+
+    The pool is created lazily on first use.  When all warm containers are
+    busy the request takes the cold path instead of queueing, so the pool is
+    strictly a fast path.
+    """
+    global _WARM_CONTAINER_POOL
+
+    if not DOCKER_IMAGE or AGENT_WARM_CONTAINERS <= 0:
+        return None
+
+    if _WARM_CONTAINER_POOL is None:
+        async with _WARM_POOL_LOCK:
+            if _WARM_CONTAINER_POOL is None:
+                pool: asyncio.Queue = asyncio.Queue()
+                for _ in range(AGENT_WARM_CONTAINERS):
+                    container_id = await _start_warm_container()
+                    if container_id:
+                        pool.put_nowait(container_id)
+                logger.info(
+                    "agent warm container pool ready: size=%s image=%s",
+                    pool.qsize(),
+                    DOCKER_IMAGE,
+                )
+                _WARM_CONTAINER_POOL = pool
+
+    try:
+        return _WARM_CONTAINER_POOL.get_nowait()
+    except asyncio.QueueEmpty:
+        return None
+
+
+def _release_warm_container(container_id: Optional[str], healthy: bool = True) -> None:
+    """Return a container to the pool, or replace it.
+
+    Pass healthy=False when the run was force-stopped, timed out, or failed
+    in a way that may have left the agent process running inside the
+    container; the container is then removed and a fresh one started rather
+    than poisoning the pool.  The check-and-requeue runs as a fire-and-forget
+    task so the (synchronous) finally blocks of the run paths stay cheap.
+    """
+    if container_id and _WARM_CONTAINER_POOL is not None:
+        asyncio.get_running_loop().create_task(
+            _requeue_warm_container(container_id, healthy)
+        )
+
+
+async def _requeue_warm_container(container_id: str, healthy: bool) -> None:
+    if healthy and await _is_warm_container_running(container_id):
+        _WARM_CONTAINER_POOL.put_nowait(container_id)
+        return
+    await _remove_warm_container(container_id)
+    replacement = await _start_warm_container()
+    if replacement:
+        _WARM_CONTAINER_POOL.put_nowait(replacement)
+
+
+@app.on_event("shutdown")
+async def _shutdown_warm_container_pool() -> None:
+    for container_id in list(_WARM_CONTAINER_IDS):
+        await _remove_warm_container(container_id)
+
+
+async def _build_agent_command_pooled(
+    agent: str,
+    args: List[str],
+    req_env: Optional[Dict[str, str]],
+) -> tuple[List[str], Dict[str, str], Optional[str]]:
+    """Like _build_agent_command, but dispatches to a warm container when one
+    is available.  Returns (command, popen_env, warm_container_id); the caller
+    must release the container id after the subprocess finishes."""
+    container_id = await _acquire_warm_container()
+    if container_id is None:
+        command, popen_env = _build_agent_command(agent, args, req_env)
+        return command, popen_env, None
+
+    normalized_args = list(args)
+    model, stripped_args = _split_model_args(normalized_args)
+    if agent in ("opencode", "codex", "kimi"):
+        normalized_args = stripped_args
+
+    command = ["docker", "exec", "-i"]
+    command.extend(_docker_env_flags(agent, model, req_env))
+    command.append(container_id)
+    command.append(agent)
+    command.extend(normalized_args)
+    return command, BASE_ENV, container_id
 
 
 def _team_specialist_agents() -> List[str]:
@@ -975,7 +1415,7 @@ async def _execute_agent_once(
     stdin_payload: str,
     req_env: Optional[Dict[str, str]],
 ) -> Dict[str, Any]:
-    command, popen_env = _build_agent_command(agent, args, req_env)
+    command, popen_env, warm_container_id = await _build_agent_command_pooled(agent, args, req_env)
     timeout_message = (
         "Request timed out while waiting for agent response "
         f"({RESPONSE_TIMEOUT_SECONDS}s)."
@@ -983,39 +1423,66 @@ async def _execute_agent_once(
 
     current_payload = stdin_payload
     compression_retried = False
-    while True:
-        exit_code, stdout_text, stderr_text = await _run_subprocess_capture_with_stdin(
-            command,
-            stdin_text=current_payload,
-            timeout=RESPONSE_TIMEOUT_SECONDS,
-            timeout_message=timeout_message,
-            env=popen_env,
-        )
+    # docker exec does not forward signals into the container, so any run
+    # that did not finish on its own (timeout kill, cancellation) may have
+    # left the agent alive inside; hand the container back as unhealthy so
+    # it is replaced instead of reused.
+    warm_healthy = True
+    try:
+        while True:
+            exit_code, stdout_text, stderr_text = await _run_subprocess_capture_with_stdin(
+                command,
+                stdin_text=current_payload,
+                timeout=RESPONSE_TIMEOUT_SECONDS,
+                timeout_message=timeout_message,
+                env=popen_env,
+            )
 
-        should_retry_with_compression = (
-            AUTO_COMPRESS_ON_CONTEXT_OVERFLOW
-            and not compression_retried
-            and exit_code != 0
-            and _is_context_overflow_error(stderr_text)
-        )
-        if should_retry_with_compression:
-            compressed_payload = _compress_stdin_payload(
-                current_payload,
-                AUTO_COMPRESS_MAX_CHARS,
-                AUTO_COMPRESS_KEEP_HEAD_CHARS,
+            should_retry_with_compression = (
+                AUTO_COMPRESS_ON_CONTEXT_OVERFLOW
+                and not compression_retried
+                and exit_code != 0
+                and _is_context_overflow_error(stderr_text)
             )
-            if compressed_payload != current_payload:
-                current_payload = compressed_payload
-                compression_retried = True
-                continue
+            if should_retry_with_compression:
+                compressed_payload = _compress_stdin_payload(
+                    current_payload,
+                    AUTO_COMPRESS_MAX_CHARS,
+                    AUTO_COMPRESS_KEEP_HEAD_CHARS,
+                )
+                if compressed_payload != current_payload:
+                    current_payload = compressed_payload
+                    compression_retried = True
+                    continue
+
+            return {
+                "agent": agent,
+                "exit_code": exit_code,
+                "stdout": stdout_text,
+                "stderr": stderr_text,
+                "compressed_retry": compression_retried,
+            }
+    except BaseException:
+        warm_healthy = False
+        raise
+    finally:
+        _release_warm_container(warm_container_id, healthy=warm_healthy)
 
-        return {
-            "agent": agent,
-            "exit_code": exit_code,
-            "stdout": stdout_text,
-            "stderr": stderr_text,
-            "compressed_retry": compression_retried,
-        }
+
+async def _run_specialists_structured(coros: List[Any]) -> List[Dict[str, Any]]:
+    """Run one collaboration round under a TaskGroup.
+
+    Unlike bare asyncio.gather, a failing specialist cancels its siblings
+    immediately instead of leaving their agent subprocesses running to
+    completion behind a propagated exception.  The first underlying error is
+    re-raised as-is so the route's existing except chain keeps working.
+    """
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(coro) for coro in coros]
+    except BaseExceptionGroup as error_group:
+        raise error_group.exceptions[0] from error_group
+    return [task.result() for task in tasks]
 
 
 async def _execute_team_collaboration(
@@ -1024,7 +1491,7 @@ async def _execute_team_collaboration(
     stdin_payload: str,
     req_env: Optional[Dict[str, str]],
 ) -> Dict[str, Any]:
-    await _assert_session_not_stopped(session_id)
+    _assert_session_not_stopped(session_id)
 
     specialists = _team_specialist_agents()
     if not specialists:
@@ -1047,7 +1514,7 @@ async def _execute_team_collaboration(
     for index, agent_name in enumerate(specialists):
         role_by_agent[agent_name] = team_roles[index % len(team_roles)]
 
-    round1_tasks = [
+    round1_coros = [
         _execute_agent_once(
             agent_name,
             normalized_req_args,
@@ -1056,13 +1523,13 @@ async def _execute_team_collaboration(
         )
         for agent_name in specialists
     ]
-    round1_results = await asyncio.gather(*round1_tasks)
-    await _assert_session_not_stopped(session_id)
+    round1_results = await _run_specialists_structured(round1_coros)
+    _assert_session_not_stopped(session_id)
     round1_stdout_map: Dict[str, str] = {
         result["agent"]: (result.get("stdout") or "").strip() for result in round1_results
     }
 
-    round2_tasks = [
+    round2_coros = [
         _execute_agent_once(
             agent_name,
             normalized_req_args,
@@ -1076,8 +1543,8 @@ async def _execute_team_collaboration(
         )
         for agent_name in specialists
     ]
-    round2_results = await asyncio.gather(*round2_tasks)
-    await _assert_session_not_stopped(session_id)
+    round2_results = await _run_specialists_structured(round2_coros)
+    _assert_session_not_stopped(session_id)
     round2_stdout_map: Dict[str, str] = {
         result["agent"]: (result.get("stdout") or "").strip() for result in round2_results
     }
@@ -1105,18 +1572,63 @@ async def _execute_team_collaboration(
     }
 
 
+# Signal escalation schedule used when stopping agent processes.  SIGINT is
+# tried first because well-behaved CLIs treat it as a graceful cancel and
+# exit quickly; SIGTERM and SIGKILL follow on shorter deadlines than the old
+# flat 2s terminate/kill loop.
+STOP_SIGINT_TIMEOUT_SECONDS = (
+    _parse_response_timeout_seconds(os.environ.get("STOP_SIGINT_TIMEOUT_SECONDS")) or 0.5
+)
+STOP_SIGTERM_TIMEOUT_SECONDS = (
+    _parse_response_timeout_seconds(os.environ.get("STOP_SIGTERM_TIMEOUT_SECONDS")) or 1.0
+)
+
+
+def _signal_process_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """Signal the process's whole group so agent-spawned children die too.
+
+    Subprocesses are started with start_new_session=True, making the child
+    the leader of its own group; workers forked by node/npx-based CLIs would
+    otherwise outlive the parent and leak descriptors and memory.
+    """
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        raise
+    except OSError:
+        process.send_signal(sig)
+
+
 async def _terminate_process(process: asyncio.subprocess.Process) -> None:
     if process.returncode is not None:
         return
 
-    process.terminate()
     try:
-        await asyncio.wait_for(process.wait(), timeout=2)
+        _signal_process_group(process, signal.SIGINT)
+    except ProcessLookupError:
+        await process.wait()
+        return
+    try:
+        await asyncio.wait_for(process.wait(), timeout=STOP_SIGINT_TIMEOUT_SECONDS)
         return
     except asyncio.TimeoutError:
         pass
 
-    process.kill()
+    try:
+        _signal_process_group(process, signal.SIGTERM)
+    except ProcessLookupError:
+        await process.wait()
+        return
+    try:
+        await asyncio.wait_for(process.wait(), timeout=STOP_SIGTERM_TIMEOUT_SECONDS)
+        return
+    except asyncio.TimeoutError:
+        pass
+
+    try:
+        _signal_process_group(process, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
     await process.wait()
 
 
@@ -1131,59 +1643,171 @@ async def _await_with_deadline(coro, deadline: Optional[float]):
     return await asyncio.wait_for(coro, timeout=remaining)
 
 
-async def _register_session(sessionId: str, process: asyncio.subprocess.Process) -> None:
-    async with SESSIONS_LOCK:
-        RUN_SESSIONS[sessionId] = process
+# Optional Redis-backed session routing.  The in-process registry only lets
+# POST /sessions/{id}/stop reach runs on the same worker; when
+# SESSION_REDIS_URL is set, each run is also recorded in Redis and a pub/sub
+# listener delivers remote stop requests to the worker that owns the
+# process, so the service can scale to multiple uvicorn workers.
+SESSION_REDIS_URL = (os.environ.get("SESSION_REDIS_URL") or "").strip()
+SESSION_REDIS_KEY_TTL_SECONDS = 86_400
+
+_SESSION_REDIS = None
+_SESSION_STOP_LISTENERS: Dict[str, asyncio.Task] = {}
 
 
-async def _unregister_session(sessionId: str, process: Optional[asyncio.subprocess.Process]) -> None:
-    async with SESSIONS_LOCK:
-        current = RUN_SESSIONS.get(sessionId)
-        if process is None or current is process:
-            RUN_SESSIONS.pop(sessionId, None)
-        STOP_REQUESTED_SESSIONS.discard(sessionId)
+def _session_redis():
+    global _SESSION_REDIS
+    if not SESSION_REDIS_URL or redis_asyncio is None:
+        return None
+    if _SESSION_REDIS is None:
+        _SESSION_REDIS = redis_asyncio.from_url(SESSION_REDIS_URL)
+    return _SESSION_REDIS
 
 
-async def _mark_stop_requested(sessionId: str) -> None:
-    async with SESSIONS_LOCK:
-        STOP_REQUESTED_SESSIONS.add(sessionId)
+def _session_redis_key(sessionId: str) -> str:
+    return f"codex.serve.run:{sessionId}"
 
 
-async def _consume_stop_requested(sessionId: str) -> bool:
-    async with SESSIONS_LOCK:
-        if sessionId in STOP_REQUESTED_SESSIONS:
-            STOP_REQUESTED_SESSIONS.remove(sessionId)
-            return True
+def _session_stop_channel(sessionId: str) -> str:
+    return f"codex.serve.stop:{sessionId}"
+
+
+async def _listen_for_remote_stop(sessionId: str) -> None:
+    client = _session_redis()
+    if client is None:
+        return
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(_session_stop_channel(sessionId))
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            _mark_stop_requested(sessionId)
+            process = RUN_SESSIONS.get(sessionId)
+            if process is not None:
+                await _terminate_process(process)
+            break
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.warning("session stop listener failed: session=%s error=%s", sessionId, exc)
+    finally:
+        try:
+            await pubsub.close()
+        except Exception:
+            pass
+
+
+async def _redis_register_session(sessionId: str) -> None:
+    client = _session_redis()
+    if client is None:
+        return
+    try:
+        await client.set(
+            _session_redis_key(sessionId),
+            str(os.getpid()),
+            ex=SESSION_REDIS_KEY_TTL_SECONDS,
+        )
+    except Exception as exc:
+        logger.warning("failed to record session in redis: session=%s error=%s", sessionId, exc)
+
+
+async def _redis_unregister_session(sessionId: str) -> None:
+    client = _session_redis()
+    if client is None:
+        return
+    try:
+        await client.delete(_session_redis_key(sessionId))
+    except Exception as exc:
+        logger.warning("failed to remove session from redis: session=%s error=%s", sessionId, exc)
+
+
+async def _publish_remote_stop(sessionId: str) -> bool:
+    """Ask whichever worker owns sessionId to stop it.  Returns True only
+    when at least one live listener received the message: the registry key
+    alone is not proof of a running session (a crashed worker leaves it
+    behind until the TTL expires), so success is judged by PUBLISH's
+    receiver count instead of an optimistic EXISTS check."""
+    client = _session_redis()
+    if client is None:
+        return False
+    try:
+        receivers = await client.publish(_session_stop_channel(sessionId), "stop")
+        return bool(receivers)
+    except Exception as exc:
+        logger.warning("failed to publish remote stop: session=%s error=%s", sessionId, exc)
         return False
 
 
-async def _get_active_session_process(sessionId: str) -> Optional[asyncio.subprocess.Process]:
-    async with SESSIONS_LOCK:
-        process = RUN_SESSIONS.get(sessionId)
-        if process is None or process.returncode is not None:
-            return None
-        return process
+def _start_remote_stop_listener(sessionId: str) -> None:
+    if _session_redis() is None:
+        return
+    loop = asyncio.get_running_loop()
+    loop.create_task(_redis_register_session(sessionId))
+    listener = _SESSION_STOP_LISTENERS.pop(sessionId, None)
+    if listener is not None:
+        listener.cancel()
+    _SESSION_STOP_LISTENERS[sessionId] = loop.create_task(_listen_for_remote_stop(sessionId))
+
+
+def _stop_remote_stop_listener(sessionId: str) -> None:
+    listener = _SESSION_STOP_LISTENERS.pop(sessionId, None)
+    if listener is not None:
+        listener.cancel()
+    if _session_redis() is not None:
+        asyncio.get_running_loop().create_task(_redis_unregister_session(sessionId))
 
 
-async def _is_team_session_active(sessionId: str) -> bool:
-    async with SESSIONS_LOCK:
-        return sessionId in TEAM_RUN_SESSIONS
+def _register_session(sessionId: str, process: asyncio.subprocess.Process) -> None:
+    RUN_SESSIONS[sessionId] = process
+    _start_remote_stop_listener(sessionId)
 
 
-async def _register_team_session(sessionId: str) -> None:
-    async with SESSIONS_LOCK:
-        TEAM_RUN_SESSIONS.add(sessionId)
+def _unregister_session(sessionId: str, process: Optional[asyncio.subprocess.Process]) -> None:
+    current = RUN_SESSIONS.get(sessionId)
+    if process is None or current is process:
+        RUN_SESSIONS.pop(sessionId, None)
+    STOP_REQUESTED_SESSIONS.discard(sessionId)
+    _stop_remote_stop_listener(sessionId)
 
 
-async def _unregister_team_session(sessionId: str) -> None:
-    async with SESSIONS_LOCK:
-        TEAM_RUN_SESSIONS.discard(sessionId)
-        STOP_REQUESTED_SESSIONS.discard(sessionId)
+def _mark_stop_requested(sessionId: str) -> None:
+    STOP_REQUESTED_SESSIONS.add(sessionId)
 
 
-async def _assert_session_not_stopped(sessionId: str) -> None:
-    stopped = await _consume_stop_requested(sessionId)
-    if stopped:
+def _consume_stop_requested(sessionId: str) -> bool:
+    if sessionId in STOP_REQUESTED_SESSIONS:
+        STOP_REQUESTED_SESSIONS.remove(sessionId)
+        return True
+    return False
+
+
+def _get_active_session_process(sessionId: str) -> Optional[asyncio.subprocess.Process]:
+    process = RUN_SESSIONS.get(sessionId)
+    if process is None or process.returncode is not None:
+        return None
+    return process
+
+
+def _is_team_session_active(sessionId: str) -> bool:
+    return sessionId in TEAM_RUN_SESSIONS
+
+
+def _register_team_session(sessionId: str) -> None:
+    TEAM_RUN_SESSIONS.add(sessionId)
+    # Team runs have no process in RUN_SESSIONS; the remote listener marks
+    # the stop flag and the between-rounds check aborts the collaboration.
+    _start_remote_stop_listener(sessionId)
+
+
+def _unregister_team_session(sessionId: str) -> None:
+    TEAM_RUN_SESSIONS.discard(sessionId)
+    STOP_REQUESTED_SESSIONS.discard(sessionId)
+    _stop_remote_stop_listener(sessionId)
+
+
+def _assert_session_not_stopped(sessionId: str) -> None:
+    if _consume_stop_requested(sessionId):
         raise asyncio.CancelledError("Session stopped via API.")
 
 
@@ -1303,6 +1927,7 @@ async def _run_subprocess_capture(
         stderr=asyncio.subprocess.PIPE,
         cwd=cwd,
         env=env,
+        start_new_session=True,
     )
     try:
         if timeout is not None:
@@ -1335,6 +1960,7 @@ async def _run_subprocess_capture_with_stdin(
         stderr=asyncio.subprocess.PIPE,
         cwd=cwd,
         env=env,
+        start_new_session=True,
     )
     try:
         payload = (stdin_text or "").encode("utf-8")
@@ -1686,21 +2312,43 @@ async def _ensure_graph_backend_ready() -> None:
             await asyncio.sleep(1.0)
 
 
-@app.get("/models")
-async def get_models():
-    return {
+def _encode_static_payload(payload: Dict[str, Any]) -> tuple[bytes, str]:
+    body = orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode("utf-8")
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    return body, etag
+
+
+# AGENT_MODEL and AGENT_LIST are fixed for the process lifetime, so the
+# /models and /agents responses are encoded once at import and served as-is;
+# the ETag lets polling clients revalidate with a 304.
+_MODELS_BODY, _MODELS_ETAG = _encode_static_payload(
+    {
         "models": AGENT_MODEL,
         "count": len(AGENT_MODEL),
     }
+)
+_AGENTS_BODY, _AGENTS_ETAG = _encode_static_payload(
+    {
+        "agents": sorted(set(AGENT_LIST)),
+        "count": len(set(AGENT_LIST)),
+    }
+)
+
+
+def _static_json_response(request: Request, body: bytes, etag: str) -> Response:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/models")
+async def get_models(request: Request):
+    return _static_json_response(request, _MODELS_BODY, _MODELS_ETAG)
 
 
 @app.get("/agents")
-async def get_agents():
-    agents = sorted(set(AGENT_LIST))
-    return {
-        "agents": agents,
-        "count": len(agents),
-    }
+async def get_agents(request: Request):
+    return _static_json_response(request, _AGENTS_BODY, _AGENTS_ETAG)
 
 
 @app.post("/sessions/{sessionId}/stop")
@@ -1709,12 +2357,19 @@ async def stop_session(sessionId: str):
     if not normalizedSessionId:
         raise HTTPException(status_code=400, detail="sessionId cannot be empty")
 
-    process = await _get_active_session_process(normalizedSessionId)
-    team_session_active = await _is_team_session_active(normalizedSessionId)
+    process = _get_active_session_process(normalizedSessionId)
+    team_session_active = _is_team_session_active(normalizedSessionId)
     if process is None and not team_session_active:
+        # The session may be running on another worker; route the stop
+        # through Redis pub/sub when configured.
+        if await _publish_remote_stop(normalizedSessionId):
+            return {
+                "sessionId": normalizedSessionId,
+                "status": "stopped",
+            }
         raise HTTPException(status_code=404, detail=f"Session not found or already finished: {normalizedSessionId}")
 
-    await _mark_stop_requested(normalizedSessionId)
+    _mark_stop_requested(normalizedSessionId)
     if process is not None:
         await _terminate_process(process)
     return {
@@ -2150,20 +2805,141 @@ async def run_sandbox(req: SandboxRunRequest):
     finally:
         queue_lease.release()
 
+@app.post("/agent/run/raw")
+async def run_agent_raw(request: Request):
+    """Stream raw agent stdout bytes without NDJSON framing.
+
+    For agents that emit large outputs (code generation, archives, logs) the
+    bytes -> str -> JSON -> bytes round trip of the typed stream is pure
+    overhead.  This endpoint forwards stdout chunks unchanged as
+    application/octet-stream; stderr is drained and discarded, and the
+    session id is returned in the X-Session-Id response header so the
+    session can still be stopped via the sessions API.
+    """
+    req = await _decode_run_request(request)
+    if req.agent not in AGENT_SET:
+        raise HTTPException(status_code=400, detail=f"Unsupported agent: {req.agent}")
+    if req.agent == TEAM_AGENT_NAME:
+        raise HTTPException(status_code=400, detail="Team mode is not supported on the raw endpoint")
+
+    normalized_session_id = req.sessionId.strip() if req.sessionId else ""
+    # Id generation is skipped entirely when the caller manages its own ids;
+    # token_hex gives the same 128 bits of randomness as uuid4 without the
+    # UUID object construction and formatting.
+    sessionId = normalized_session_id or secrets.token_hex(16)
+    stdin_payload = _build_stdin_with_context(req.stdin, req.contextFiles)
+
+    if _get_active_session_process(sessionId) is not None:
+        raise HTTPException(status_code=409, detail=f"Session is already running: {sessionId}")
+
+    normalized_req_args = list(req.args)
+    auto_selected_model = await _resolve_auto_model(normalized_req_args, req.env)
+    if auto_selected_model:
+        normalized_req_args = _replace_model_args(normalized_req_args, auto_selected_model)
+
+    # Take the queue lease before drawing a warm container so a 503 from a
+    # full queue cannot strand the container, and queued requests do not
+    # hoard pool members while they wait.
+    queue_lease = await AGENT_REQUEST_QUEUE.acquire()
+    try:
+        command, popen_env, warm_container_id = await _build_agent_command_pooled(
+            req.agent, normalized_req_args, req.env
+        )
+    except BaseException:
+        queue_lease.release()
+        raise
+
+    async def raw_stream():
+        process = None
+        stderr_task = None
+        # Killing the docker exec client (stop API, timeout) does not reach
+        # the agent inside a warm container; flag those runs so the
+        # container is replaced rather than returned to the pool.
+        warm_healthy = True
+        try:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=popen_env,
+                    start_new_session=True,
+                )
+                _register_session(sessionId, process)
+
+                if stdin_payload:
+                    process.stdin.write(stdin_payload.encode())
+                    await process.stdin.drain()
+                process.stdin.close()
+
+                async def drain_stderr():
+                    while True:
+                        chunk = await process.stderr.read(STREAM_READ_CHUNK_BYTES)
+                        if not chunk:
+                            break
+
+                stderr_task = asyncio.create_task(drain_stderr())
+
+                deadline = None
+                if RESPONSE_TIMEOUT_SECONDS is not None:
+                    deadline = asyncio.get_running_loop().time() + RESPONSE_TIMEOUT_SECONDS
+
+                while True:
+                    chunk = await _await_with_deadline(
+                        process.stdout.read(STREAM_READ_CHUNK_BYTES), deadline
+                    )
+                    if not chunk:
+                        break
+                    yield chunk
+
+                await _await_with_deadline(process.wait(), deadline)
+            except asyncio.TimeoutError:
+                warm_healthy = False
+                if process is not None:
+                    await _terminate_process(process)
+            except BaseException:
+                warm_healthy = False
+                raise
+            finally:
+                if stderr_task is not None:
+                    stderr_task.cancel()
+                    await asyncio.gather(stderr_task, return_exceptions=True)
+        finally:
+            # Sync-only cleanup in its own finally: a client disconnect
+            # re-delivers the cancellation at the first await of the inner
+            # finally, which would skip anything placed after it there.
+            if _consume_stop_requested(sessionId):
+                warm_healthy = False
+            _unregister_session(sessionId, process)
+            _release_warm_container(warm_container_id, healthy=warm_healthy)
+            queue_lease.release()
+
+    return StreamingResponse(
+        raw_stream(),
+        media_type="application/octet-stream",
+        headers={"X-Session-Id": sessionId},
+    )
+
+
 @app.post("/agent/run")
-async def run_agent(req: RunRequest):
-    if req.agent not in AGENT_LIST:
+async def run_agent(request: Request):
+    req = await _decode_run_request(request)
+    if req.agent not in AGENT_SET:
         raise HTTPException(status_code=400, detail=f"Unsupported agent: {req.agent}")
 
     normalized_session_id = req.sessionId.strip() if req.sessionId else ""
-    sessionId = normalized_session_id if normalized_session_id else str(uuid4())
+    # Id generation is skipped entirely when the caller manages its own ids;
+    # token_hex gives the same 128 bits of randomness as uuid4 without the
+    # UUID object construction and formatting.
+    sessionId = normalized_session_id or secrets.token_hex(16)
     stdin_payload = _build_stdin_with_context(req.stdin, req.contextFiles)
 
-    existing_process = await _get_active_session_process(sessionId)
+    existing_process = _get_active_session_process(sessionId)
     if existing_process is not None:
         raise HTTPException(status_code=409, detail=f"Session is already running: {sessionId}")
 
-    if req.agent == TEAM_AGENT_NAME and await _is_team_session_active(sessionId):
+    if req.agent == TEAM_AGENT_NAME and _is_team_session_active(sessionId):
         raise HTTPException(status_code=409, detail=f"Session is already running: {sessionId}")
 
     normalized_req_args = list(req.args)
@@ -2171,22 +2947,34 @@ async def run_agent(req: RunRequest):
     if auto_selected_model:
         normalized_req_args = _replace_model_args(normalized_req_args, auto_selected_model)
 
-    command, popen_env = _build_agent_command(req.agent, normalized_req_args, req.env)
-
+    # Take the queue lease before drawing a warm container so a 503 from a
+    # full queue cannot strand the container, and queued requests do not
+    # hoard pool members while they wait.
     queue_lease = await AGENT_REQUEST_QUEUE.acquire()
+    try:
+        if req.agent == TEAM_AGENT_NAME:
+            command, popen_env = _build_agent_command(req.agent, normalized_req_args, req.env)
+            warm_container_id = None
+        else:
+            command, popen_env, warm_container_id = await _build_agent_command_pooled(
+                req.agent, normalized_req_args, req.env
+            )
+    except BaseException:
+        queue_lease.release()
+        raise
 
     async def stream_generator():
-        yield json.dumps({"type": "session", "id": sessionId}) + "\n"
+        yield _encode_ndjson_frame({"type": "session", "id": sessionId})
 
         if req.agent == TEAM_AGENT_NAME:
             try:
-                await _register_team_session(sessionId)
-                yield json.dumps(
+                _register_team_session(sessionId)
+                yield _encode_ndjson_frame(
                     {
                         "type": "stderr",
                         "data": "Team mode enabled. Running multi-agent collaboration in parallel.\n",
                     }
-                ) + "\n"
+                )
                 team_result = await _execute_team_collaboration(
                     session_id=sessionId,
                     normalized_req_args=normalized_req_args,
@@ -2199,14 +2987,14 @@ async def run_agent(req: RunRequest):
                         agent_name = item.get("agent") or "unknown"
                         exit_code = item.get("exit_code", 1)
                         retry_note = " with compressed-retry" if item.get("compressed_retry") else ""
-                        yield json.dumps(
+                        yield _encode_ndjson_frame(
                             {
                                 "type": "stderr",
                                 "data": (
                                     f"[team/{round_key}] {agent_name} finished with exit {exit_code}{retry_note}.\n"
                                 ),
                             }
-                        ) + "\n"
+                        )
 
                 synthesis = team_result.get("synthesis") or {}
                 synthesis_stdout = (synthesis.get("stdout") or "").strip()
@@ -2214,54 +3002,58 @@ async def run_agent(req: RunRequest):
                 synthesis_code = synthesis.get("exit_code", 1)
 
                 if synthesis_stderr:
-                    yield json.dumps(
+                    yield _encode_ndjson_frame(
                         {
                             "type": "stderr",
                             "data": f"[team/synthesis] {synthesis_stderr}\n",
                         }
-                    ) + "\n"
+                    )
 
                 if synthesis_stdout:
                     if not synthesis_stdout.endswith("\n"):
                         synthesis_stdout += "\n"
-                    yield json.dumps(
+                    yield _encode_ndjson_frame(
                         {
                             "type": "stdout",
                             "data": synthesis_stdout,
                         }
-                    ) + "\n"
+                    )
 
-                yield json.dumps({"type": "exit", "code": synthesis_code}) + "\n"
+                yield _encode_ndjson_frame({"type": "exit", "code": synthesis_code})
             except asyncio.CancelledError:
-                yield json.dumps({"type": "stderr", "data": "Session stopped via API.\n"}) + "\n"
-                yield json.dumps({"type": "exit", "code": 0}) + "\n"
+                yield _encode_ndjson_frame({"type": "stderr", "data": "Session stopped via API.\n"})
+                yield _encode_ndjson_frame({"type": "exit", "code": 0})
             except asyncio.TimeoutError:
                 timeout_msg = (
                     "Request timed out while waiting for team response "
                     f"({RESPONSE_TIMEOUT_SECONDS}s)."
                 )
-                yield json.dumps({"type": "stderr", "data": timeout_msg}) + "\n"
-                yield json.dumps({"type": "exit", "code": 124}) + "\n"
+                yield _encode_ndjson_frame({"type": "stderr", "data": timeout_msg})
+                yield _encode_ndjson_frame({"type": "exit", "code": 124})
             except HTTPException as http_error:
                 detail = str(http_error.detail) if http_error.detail is not None else "Team execution failed"
-                yield json.dumps({"type": "stderr", "data": f"{detail}\n"}) + "\n"
-                yield json.dumps({"type": "exit", "code": 1}) + "\n"
+                yield _encode_ndjson_frame({"type": "stderr", "data": f"{detail}\n"})
+                yield _encode_ndjson_frame({"type": "exit", "code": 1})
             except Exception as error:
-                yield json.dumps(
+                yield _encode_ndjson_frame(
                     {"type": "stderr", "data": f"Internal Server Error: {str(error)}"}
-                ) + "\n"
-                yield json.dumps({"type": "exit", "code": 1}) + "\n"
+                )
+                yield _encode_ndjson_frame({"type": "exit", "code": 1})
             finally:
-                await _unregister_team_session(sessionId)
+                _unregister_team_session(sessionId)
                 queue_lease.release()
             return
 
         stdin_payload_current = stdin_payload
         compression_retried = False
+        # Killing the docker exec client (stop API, timeout, stray errors)
+        # does not reach the agent inside a warm container; flag those runs
+        # so the container is replaced rather than returned to the pool.
+        warm_healthy = True
 
         try:
             while True:
-                read_tasks = []
+                read_tasks = set()
                 process = None
                 stderr_events: List[str] = []
                 try:
@@ -2270,79 +3062,133 @@ async def run_agent(req: RunRequest):
                         stdin=asyncio.subprocess.PIPE,
                         stdout=asyncio.subprocess.PIPE,
                         stderr=asyncio.subprocess.PIPE,
-                        env=popen_env
+                        env=popen_env,
+                        start_new_session=True,
                     )
-                    await _register_session(sessionId, process)
+                    _register_session(sessionId, process)
 
                     if stdin_payload_current:
                         process.stdin.write(stdin_payload_current.encode())
                         await process.stdin.drain()
                     process.stdin.close()
 
-                    queue = asyncio.Queue()
-
-                    async def read_stream(stream, type_label):
-                        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
-                        buffer = ""
-                        try:
-                            while True:
-                                chunk = await stream.read(4096)
-                                if not chunk:
-                                    break
-
-                                buffer += decoder.decode(chunk)
-
-                                while True:
-                                    newline_index = buffer.find("\n")
-                                    if newline_index == -1:
-                                        break
-                                    line = buffer[: newline_index + 1]
-                                    buffer = buffer[newline_index + 1 :]
-                                    await queue.put({"type": type_label, "data": line})
-
-                            buffer += decoder.decode(b"", final=True)
-                            if buffer:
-                                await queue.put({"type": type_label, "data": buffer})
-                        except Exception as stream_error:
-                            await queue.put(
-                                {
-                                    "type": "stderr",
-                                    "data": f"{type_label} stream read failed: {str(stream_error)}\n",
-                                }
-                            )
-                        finally:
-                            await queue.put(None)
-
-                    read_tasks = [
-                        asyncio.create_task(read_stream(process.stdout, "stdout")),
-                        asyncio.create_task(read_stream(process.stderr, "stderr")),
-                    ]
+                    # Read both pipes directly with asyncio.wait instead of
+                    # fanning chunks through an asyncio.Queue: one task wake-up
+                    # per chunk and no intermediary hop between the reader and
+                    # the HTTP generator.
+                    streams = {"stdout": process.stdout, "stderr": process.stderr}
+                    decoders = {
+                        type_label: codecs.getincrementaldecoder("utf-8")(errors="replace")
+                        for type_label in streams
+                    }
 
                     deadline = None
                     if RESPONSE_TIMEOUT_SECONDS is not None:
                         deadline = asyncio.get_running_loop().time() + RESPONSE_TIMEOUT_SECONDS
 
-                    active_streams = 2
-                    while active_streams > 0:
-                        item = await _await_with_deadline(queue.get(), deadline)
-                        if item is None:
-                            active_streams -= 1
+                    read_tasks = {
+                        asyncio.create_task(stream.read(STREAM_READ_CHUNK_BYTES), name=type_label)
+                        for type_label, stream in streams.items()
+                    }
+
+                    # Coalesced frames waiting to be sent as one HTTP chunk.
+                    pending_frames = bytearray()
+                    flush_deadline = None
+
+                    while read_tasks:
+                        if deadline is not None:
+                            remaining = deadline - asyncio.get_running_loop().time()
+                            if remaining <= 0:
+                                raise asyncio.TimeoutError()
+                        else:
+                            remaining = None
+
+                        wait_timeout = remaining
+                        if flush_deadline is not None:
+                            flush_remaining = max(
+                                0.0, flush_deadline - asyncio.get_running_loop().time()
+                            )
+                            if wait_timeout is None or flush_remaining < wait_timeout:
+                                wait_timeout = flush_remaining
+
+                        done, read_tasks = await asyncio.wait(
+                            read_tasks,
+                            timeout=wait_timeout,
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                        if not done:
+                            if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+                                raise asyncio.TimeoutError()
+                            # Flush window elapsed with no new data.
+                            if pending_frames:
+                                yield bytes(pending_frames)
+                                pending_frames.clear()
+                            flush_deadline = None
                             continue
 
-                        if item.get("type") == "stderr":
-                            data = item.get("data")
-                            if isinstance(data, str) and data:
-                                stderr_events.append(data)
+                        for finished_task in done:
+                            type_label = finished_task.get_name()
+                            try:
+                                chunk = finished_task.result()
+                            except Exception as stream_error:
+                                error_line = f"{type_label} stream read failed: {str(stream_error)}\n"
+                                stderr_events.append(error_line)
                                 if len(stderr_events) > 40:
                                     stderr_events = stderr_events[-40:]
+                                pending_frames += _encode_stream_frame("stderr", error_line)
+                                continue
+
+                            decoder = decoders[type_label]
+                            if not chunk:
+                                tail = decoder.decode(b"", final=True)
+                                if tail:
+                                    if type_label == "stderr":
+                                        stderr_events.append(tail)
+                                        if len(stderr_events) > 40:
+                                            stderr_events = stderr_events[-40:]
+                                    pending_frames += await _encode_stream_frame_offloaded(type_label, tail)
+                                continue
+
+                            # One frame per decoded read instead of per line:
+                            # the NDJSON contract only promises {"type","data"}
+                            # frames, so there is no need to scan and re-slice
+                            # the text for newlines. The incremental decoder
+                            # keeps multibyte sequences split across reads
+                            # intact.
+                            text = decoder.decode(chunk)
+                            if text:
+                                if type_label == "stderr":
+                                    stderr_events.append(text)
+                                    if len(stderr_events) > 40:
+                                        stderr_events = stderr_events[-40:]
+                                pending_frames += await _encode_stream_frame_offloaded(type_label, text)
+
+                            read_tasks.add(
+                                asyncio.create_task(
+                                    streams[type_label].read(STREAM_READ_CHUNK_BYTES), name=type_label
+                                )
+                            )
+
+                        if pending_frames:
+                            if STREAM_FLUSH_MAX_BYTES <= 0 or len(pending_frames) >= STREAM_FLUSH_MAX_BYTES:
+                                yield bytes(pending_frames)
+                                pending_frames.clear()
+                                flush_deadline = None
+                            elif flush_deadline is None:
+                                flush_deadline = (
+                                    asyncio.get_running_loop().time() + STREAM_FLUSH_WINDOW_SECONDS
+                                )
 
-                        yield json.dumps(item) + "\n"
+                    if pending_frames:
+                        yield bytes(pending_frames)
+                        pending_frames.clear()
 
                     exit_code = await _await_with_deadline(process.wait(), deadline)
-                    stopped_by_api = await _consume_stop_requested(sessionId)
+                    stopped_by_api = _consume_stop_requested(sessionId)
                     if stopped_by_api:
-                        yield json.dumps({"type": "stderr", "data": "Session stopped via API.\n"}) + "\n"
-                        yield json.dumps({"type": "exit", "code": 0}) + "\n"
+                        warm_healthy = False
+                        yield _encode_ndjson_frame({"type": "stderr", "data": "Session stopped via API.\n"})
+                        yield _encode_ndjson_frame({"type": "exit", "code": 0})
                         break
 
                     stderr_summary = "".join(stderr_events)
@@ -2362,7 +3208,7 @@ async def run_agent(req: RunRequest):
                         if compressed_payload != stdin_payload_current:
                             compression_retried = True
                             stdin_payload_current = compressed_payload
-                            yield json.dumps(
+                            yield _encode_ndjson_frame(
                                 {
                                     "type": "stderr",
                                     "data": (
@@ -2370,38 +3216,48 @@ async def run_agent(req: RunRequest):
                                         "Retrying once with compressed message history.\n"
                                     ),
                                 }
-                            ) + "\n"
+                            )
                             continue
 
-                    yield json.dumps({"type": "exit", "code": exit_code}) + "\n"
+                    yield _encode_ndjson_frame({"type": "exit", "code": exit_code})
                     break
 
                 except asyncio.TimeoutError:
+                    warm_healthy = False
                     if process is not None:
                         await _terminate_process(process)
                     timeout_msg = (
                         "Request timed out while waiting for agent response "
                         f"({RESPONSE_TIMEOUT_SECONDS}s)."
                     )
-                    yield json.dumps({"type": "stderr", "data": timeout_msg}) + "\n"
-                    yield json.dumps({"type": "exit", "code": 124}) + "\n"
+                    yield _encode_ndjson_frame({"type": "stderr", "data": timeout_msg})
+                    yield _encode_ndjson_frame({"type": "exit", "code": 124})
                     break
 
                 except Exception as e:
+                    warm_healthy = False
                     error_data = {"type": "stderr", "data": f"Internal Server Error: {str(e)}"}
-                    yield json.dumps(error_data) + "\n"
-                    yield json.dumps({"type": "exit", "code": 1}) + "\n"
+                    yield _encode_ndjson_frame(error_data)
+                    yield _encode_ndjson_frame({"type": "exit", "code": 1})
                     break
 
+                except BaseException:
+                    # Client disconnect (CancelledError/GeneratorExit): the
+                    # docker exec client dies but the agent keeps running
+                    # inside a warm container, so it must not be reused.
+                    warm_healthy = False
+                    raise
+
                 finally:
                     for task in read_tasks:
                         if not task.done():
                             task.cancel()
                     if read_tasks:
                         await asyncio.gather(*read_tasks, return_exceptions=True)
-                    await _unregister_session(sessionId, process)
+                    _unregister_session(sessionId, process)
 
         finally:
+            _release_warm_container(warm_container_id, healthy=warm_healthy)
             queue_lease.release()
 
     return StreamingResponse(stream_generator(), media_type="application/x-ndjson")
@@ -2409,4 +3265,20 @@ async def run_agent(req: RunRequest):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # Prefer the libuv-based event loop and C http parser when installed;
+    # both cut per-chunk syscall and parsing overhead for streamed responses.
+    # On newer libuv builds, UV_USE_IO_URING=1 additionally enables
+    # io_uring-backed pipe/socket I/O (Linux kernels >= 5.19).
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "auto"
+    try:
+        import httptools  # noqa: F401
+        http_impl = "httptools"
+    except ImportError:
+        http_impl = "auto"
+
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop_impl, http=http_impl)